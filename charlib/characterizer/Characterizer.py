@@ -1,6 +1,8 @@
 """Dispatches characterization jobs and manages cell data"""
 
-from multiprocessing import Pool, cpu_count
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from os import cpu_count
 from pathlib import Path
 
 from charlib.liberty.UnitsSettings import UnitsSettings
@@ -10,42 +12,59 @@ from charlib.characterizer.TestManager import TestManager, CombinationalTestMana
 class Characterizer:
     """Main object of Charlib. Keeps track of settings and cells."""
 
+    __slots__ = ('settings', 'library', 'tests')
+
     def __init__(self, **kwargs) -> None:
         self.settings = CharacterizationSettings(**kwargs)
         self.library = Library(kwargs.get('lib_name'), **kwargs)
-        self.tests = []
+        self.tests = {}
 
     def add_cell(self, name, in_ports, out_ports, functions, **kwargs):
         """Create a new logic cell test"""
-        self.tests.append(
-            CombinationalTestManager(name, in_ports, out_ports, functions, **kwargs)
-        )
+        test = CombinationalTestManager(name, in_ports, out_ports, functions, **kwargs)
+        self.tests[test.cell.name] = test
 
     def add_flop(self, name, in_ports, out_ports, clock, flops, functions, **kwargs):
         """Create a new sequential cell test"""
-        self.tests.append(
-            SequentialTestManager(name, in_ports, out_ports, clock, flops, functions, **kwargs)
-        )
-
-    def characterize(self):
-        """Characterize all cells"""
-
-        # If no target cells were given, characterize all cells
-        if self.settings.use_multithreaded:
-            num_workers = max(len(self.tests), cpu_count())
-            with Pool(num_workers) as pool:
-                cells = pool.map(self.characterize_cell, [*self.tests])
+        test = SequentialTestManager(name, in_ports, out_ports, clock, flops, functions, **kwargs)
+        self.tests[test.cell.name] = test
+
+    def __iter__(self):
+        """Iterate over cell tests in the order they were added"""
+        return iter(self.tests.values())
+
+    def __len__(self) -> int:
+        """Return the number of cell tests"""
+        return len(self.tests)
+
+    def characterize(self, *names):
+        """Characterize the named cells, or all cells if no names are given"""
+        settings = self.settings
+
+        # Look up target cells by name
+        targets = [self.tests[name.upper()] for name in names] if names else self
+
+        # Cells are independent, so dispatch them to a pool of worker processes when allowed
+        num_workers = min(len(targets), settings.jobs)
+        if settings.use_multithreaded and num_workers > 1:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                cells = list(executor.map(_characterize_test, targets, repeat(settings)))
         else:
-            cells = [self.characterize_cell(cell) for cell in self.tests]
+            cells = [test.characterize(settings) for test in targets]
 
         # Add cells to the library
-        [self.library.add_cell(cell) for cell in cells]
+        for cell in cells:
+            self.library.add_cell(cell)
 
         return self.library
 
-    def characterize_cell(self, cell):
-        """Characterize a single cell. Helper for multiprocessing"""
-        return cell.characterize(self.settings)
+
+def _characterize_test(test, settings):
+    """Characterize a single cell. Helper for multiprocessing
+
+    Cell-level workers characterize their cell serially so that we don't nest process pools."""
+    settings.use_multithreaded = False
+    return test.characterize(settings)
 
 
 class CharacterizationSettings:
@@ -54,7 +73,9 @@ class CharacterizationSettings:
         """Create a new CharacterizationSettings instance"""
         # Behavioral settings
         self.simulator = kwargs.pop('simulator', 'ngspice-shared')
+        self.ngspice_path = kwargs.pop('ngspice_path', 'ngspice')
         self.use_multithreaded = kwargs.pop('multithreaded', True)
+        self.jobs = max(int(kwargs.pop('jobs', cpu_count() or 1)), 1)
         self.results_dir = Path(kwargs.pop('results_dir', 'results'))
         self.debug = kwargs.pop('debug', False)
         self.debug_dir = Path(kwargs.pop('debug_dir', 'debug'))
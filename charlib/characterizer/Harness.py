@@ -1,6 +1,5 @@
 from dataclasses import dataclass
 
-import matplotlib.pyplot as plt
 import numpy as np
 from PySpice.Unit import *
 
@@ -57,12 +56,10 @@ class Harness:
                 # Add to nontargeted ports
                 self._nontarget_ports.append(PinTestBinding(pin))
 
-        # Initialize results from test input slopes and loads
-        self.results = {}
-        for slew in test_manager.in_slews:
-            self.results[str(slew)] = {}
-            for load in test_manager.out_loads:
-                self.results[str(slew)][str(load)] = {}
+        self._short_str = None
+
+        # Initialize results from test input slopes and loads, indexed by [slew][load]
+        self.results = [[None] * len(test_manager.out_loads) for _ in test_manager.in_slews]
 
     def __str__(self) -> str:
         """Return str(self)"""
@@ -79,6 +76,12 @@ class Harness:
         return '\n'.join(lines)
 
     def short_str(self):
+        """Return an abbreviated string for the test vector represented by this harness"""
+        if self._short_str is None:
+            self._short_str = self._format_short_str()
+        return self._short_str
+
+    def _format_short_str(self):
         """Create an abbreviated string for the test vector represented by this harness"""
         harness_str = f'{self.target_in_port.pin.name}={self.target_in_port.state}'
         for in_port in self.stable_in_ports:
@@ -134,23 +137,22 @@ class Harness:
         # TODO: Usually we want longest prop delay instead of average
         total_delay = 0.0 @ u_s
         n = 0
-        for slope in self.results.keys():
-            for load in self.results[slope].keys():
-                total_delay += self.results[slope][load]['prop_in_out'] @ u_s
+        for row in self.results:
+            for result in row:
+                total_delay += result['prop_in_out'] @ u_s
                 n += 1
         return total_delay / n
 
-    def _calc_internal_energy(self, slew: str, load: str, energy_meas_high_threshold_voltage: float):
+    def _calc_internal_energy(self, slew_index: int, load_index: int, energy_meas_high_threshold_voltage: float):
         """Calculates internal energy for a particular slope/load combination"""
         # Fetch calculation parameters, using units to validate calculation
-        slew = str(slew)
-        load = str(load)
-        t_start = self.results[slew][load]['t_energy_start'] @ u_s
-        t_end = self.results[slew][load]['t_energy_end'] @ u_s
-        q_vdd_dyn = self.results[slew][load]['q_vdd_dyn'] @ u_C
-        q_vss_dyn = self.results[slew][load]['q_vss_dyn'] @ u_C
-        i_vdd_leak = abs(self.results[slew][load]['i_vdd_leak']) @ u_A
-        i_vss_leak = abs(self.results[slew][load]['i_vss_leak']) @ u_A
+        result = self.results[slew_index][load_index]
+        t_start = result['t_energy_start'] @ u_s
+        t_end = result['t_energy_end'] @ u_s
+        q_vdd_dyn = result['q_vdd_dyn'] @ u_C
+        q_vss_dyn = result['q_vss_dyn'] @ u_C
+        i_vdd_leak = abs(result['i_vdd_leak']) @ u_A
+        i_vss_leak = abs(result['i_vss_leak']) @ u_A
         # Perform the calculation
         time_delta = (t_end - t_start)
         avg_current = ((i_vdd_leak + i_vss_leak) / 2)
@@ -167,10 +169,18 @@ class CombinationalHarness (Harness):
         # Error if we don't have a target input port
         if not self._target_in_port:
             raise ValueError(f'Unable to parse target input port from test vector {test_vector}')
+        # Propagation and transition delays in seconds, indexed by [slew][load]
+        self.prop = np.full((len(target_cell.in_slews), len(target_cell.out_loads)), np.nan)
+        self.trans = np.full_like(self.prop, np.nan)
+
+    def average_propagation_delay(self):
+        """Calculates the average propagation delay over all trials"""
+        return float(np.mean(self.prop)) @ u_s
 
     def plot_energy(self, settings, slews, loads, cell_name):
         """Plot energy vs slew rate vs fanout"""
         # TODO: Consider moving this to Pin, as all the data is eventually stored there anyways
+        import matplotlib.pyplot as plt
         figure = plt.figure()
         figure.suptitle(f'Cell {cell_name} | Arc: {self.arc_str()}')
 
@@ -178,10 +188,10 @@ class CombinationalHarness (Harness):
         ax.set_proj_type('ortho')
 
         energy_data = []
-        for slew in slews:
+        for i in range(len(slews)):
             energy_row = []
-            for load in loads:
-                energy = self._calc_internal_energy(slew, load, settings.energy_meas_high_threshold_voltage())
+            for j in range(len(loads)):
+                energy = self._calc_internal_energy(i, j, settings.energy_meas_high_threshold_voltage())
                 energy_row.append(float(energy.convert(settings.units.energy.prefixed_unit).value))
             energy_data.append(energy_row)
 
@@ -216,10 +226,12 @@ class SequentialHarness (Harness):
             pin_state_map[test_manager.set.name] = 'ignore'
         # TODO: handle flop internal states
         self.flops = []
+        # Subcircuit connections for this harness, filled in by the test manager
+        self.connections = None
         super().__init__(test_manager, pin_state_map)
 
-    def short_str(self):
-        harness_str = f'{self.clock.pin.name}={self.clock.state} {super().short_str()}'
+    def _format_short_str(self):
+        harness_str = f'{self.clock.pin.name}={self.clock.state} {super()._format_short_str()}'
         if self.set:
             harness_str += f' {self.set.pin.name}={self.set.state}'
         if self.reset:
@@ -241,6 +253,7 @@ class SequentialHarness (Harness):
     def invert_set_reset(self):
         self.set.state = self.set.state[::-1] if self.set.state else None
         self.reset.state = self.reset.state[::-1] if self.reset.state else None
+        self._short_str = None
 
     @property
     def timing_sense_constraint(self) -> str:
@@ -1,20 +1,44 @@
 """This module contains test managers for various types of standard cells"""
 
-from itertools import product
+import logging
+import mmap
+import re
+import subprocess
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import chain, product
 from pathlib import Path
 
 import numpy as np
-import matplotlib.pyplot as plt
 
 from PySpice import Circuit, Simulator, SpiceLibrary
 from PySpice.Spice.unit import str_spice
 from PySpice.Unit import *
 
 from charlib.characterizer.functions import Function, registered_functions
-from charlib.characterizer.Harness import CombinationalHarness, SequentialHarness, filter_harnesses_by_ports, find_harness_by_arc
+from charlib.characterizer.Harness import CombinationalHarness, SequentialHarness, find_harness_by_arc
 from charlib.characterizer.LogicParser import parse_logic
 from charlib.liberty.cell import Cell, Pin, TimingData, TableTemplate
 
+logger = logging.getLogger(__name__)
+
+# Match subcircuit definition and instance lines in a spice netlist
+_SUBCKT_RE = re.compile(rb'^[^\n]*SUBCKT[^\n]*', re.MULTILINE | re.IGNORECASE)
+_INSTANCE_RE = re.compile(rb'^[Xx][^\n]*', re.MULTILINE)
+# Matches measurement results printed by ngspice in batch mode
+_MEASURE_RE = re.compile(rb'^(prop_in_out|trans_out)\s*=\s*([-+\d.eE]+)', re.MULTILINE)
+
+# Functions already parsed, keyed by expression. Shared between pins and cells
+_FUNCTION_CACHE = {}
+# Valid trigger types for edge-triggered pins
+_EDGES = frozenset(('posedge', 'negedge'))
+# Simulator instances already created in this process, keyed by simulator name
+_SIMULATORS = {}
+# Test manager and settings for trials run in a worker process. See _init_trial_worker
+_worker_test_manager = None
+_worker_settings = None
+
 class TestManager:
     """A test manager for a standard cell"""
     def __init__ (self, name: str, in_ports: str|list, out_ports: list|None, functions: str|list, **kwargs):
@@ -53,19 +77,10 @@ class TestManager:
                         func_pin = func_pin.replace('<','').strip()
                     for pin_name in out_ports:
                         if pin_name == func_pin:
-                            if parse_logic(expr):
-                                # Check if we already recognize this function
-                                function = Function(expr)
-                                for reg_name, reg_func in registered_functions.items():
-                                    if reg_func == function:
-                                        # Copy test vectors
-                                        # print(f'Recognized {self.cell.name} pin {pin_name} function as {reg_name}')
-                                        function.stored_test_vectors = reg_func.test_vectors
-                                self.cell[pin_name].function = function
-                            else:
-                                raise ValueError(f'Invalid function "{expr}"')
+                            self.cell[pin_name].function = _get_function(expr)
                 else:
                     raise ValueError(f'Expected an expression of the form "Y=A Z=B" for cell function, got "{func}"')
+        self._refresh_port_caches()
 
         # Characterization settings
         self.netlist = kwargs.get('netlist')
@@ -83,20 +98,26 @@ class TestManager:
         """Return the cell under test"""
         return self._cell
 
+    def _refresh_port_caches(self):
+        """Rebuild the cached io pin and function lists. Call after adding pins to the cell."""
+        self._in_ports = [pin for pin in self.cell.pins.values() if pin.direction == 'input' and pin.is_io()]
+        self._out_ports = [pin for pin in self.cell.pins.values() if pin.direction == 'output' and pin.is_io()]
+        self._functions = [pin.function for pin in self._out_ports]
+
     @property
     def in_ports(self) -> list:
         """Return cell input io pins."""
-        return [pin for pin in self.cell.pins.values() if pin.direction == 'input' and pin.is_io()]
+        return self._in_ports
 
     @property
     def out_ports(self) -> list:
         """Return cell output io pins."""
-        return [pin for pin in self.cell.pins.values() if pin.direction == 'output' and pin.is_io()]
+        return self._out_ports
 
     @property
     def functions(self) -> list:
         """Return a list of functions on this cell's output pins."""
-        return [pin.function for pin in self.out_ports]
+        return self._functions
 
     @property
     def models(self) -> list:
@@ -151,18 +172,31 @@ class TestManager:
             self._netlist = Path(value)
         else:
             raise TypeError(f'Invalid type for netlist: {type(value)}')
+        # Invalidate anything parsed from the previous netlist
+        self._definition = None
+        self._definition_ports = None
+        self._used_models = None
 
     def definition(self) -> str:
         """Return the cell's spice definition"""
+        if self._definition is not None:
+            return self._definition
         # Search the netlist file for the circuit definition
-        with open(self.netlist, 'r') as file:
-            for line in file:
-                if self.cell.name in line.upper() and 'SUBCKT' in line.upper():
-                    file.close()
-                    return line
-            # If we reach this line before returning, the netlist file doesn't contain a circuit definition
-            file.close()
-            raise ValueError(f'No cell definition found in netlist {self.netlist}')
+        for line in _scan_netlist(self.netlist, _SUBCKT_RE):
+            if self.cell.name in line.upper():
+                self._definition = line
+                return line
+        # If we reach this line before returning, the netlist file doesn't contain a circuit definition
+        raise ValueError(f'No cell definition found in netlist {self.netlist}')
+
+    def definition_ports(self) -> tuple:
+        """Return the subcircuit name and tuple of port names from the cell's spice definition.
+
+        Names are upper-cased."""
+        if self._definition_ports is None:
+            (subcircuit_name, *ports) = self.definition().upper().split()[1:]
+            self._definition_ports = (subcircuit_name, tuple(ports))
+        return self._definition_ports
 
     def instance(self) -> str:
         """Return a subcircuit instantiation for this cell."""
@@ -175,17 +209,17 @@ class TestManager:
 
     def used_models(self) -> list:
         """Return a list of subcircuits used by this cell."""
+        if self._used_models is not None:
+            return self._used_models
         subckts = []
-        with open(self.netlist, 'r') as file:
-            for line in file:
-                if line.lower().startswith('x'):
-                    # Get the subckt name
-                    # This should be the last item that doesn't contain =
-                    for term in reversed(line.split()):
-                        if '=' not in term:
-                            subckts.append(term)
-                            break
-            file.close()
+        for line in _scan_netlist(self.netlist, _INSTANCE_RE):
+            # Get the subckt name
+            # This should be the last item that doesn't contain =
+            for term in reversed(line.split()):
+                if '=' not in term:
+                    subckts.append(term)
+                    break
+        self._used_models = subckts
         return subckts
 
     @property
@@ -234,13 +268,31 @@ class TestManager:
         """Set a flag that this test manager's results have been exported"""
         self._is_exported = True
 
+    def _use_trial_pool(self, settings) -> bool:
+        """Return whether delay trials may be dispatched to a pool of worker processes.
+
+        ngspice-shared keeps a single simulator instance per process, and io plots need the full
+        simulation analyses, which can't be sent between processes. Both run trials serially."""
+        return settings.use_multithreaded and settings.jobs > 1 \
+            and settings.simulator != 'ngspice-shared' and 'io' not in self.plots
+
+    def _trial_pool(self, settings):
+        """Return a context manager providing a process pool for delay trials, or None if trials
+        should run serially.
+
+        Each worker receives this test manager and settings once, when it starts, so that only the
+        per-trial arguments need to be sent with each job."""
+        if not self._use_trial_pool(settings):
+            return nullcontext()
+        return ProcessPoolExecutor(max_workers=settings.jobs, initializer=_init_trial_worker,
+                                   initargs=(self, settings))
+
     def _run_input_capacitance(self, settings, target_pin):
         """Measure the input capacitance of target_pin.
 
         Assuming a black-box model, treat the cell as a grounded capacitor with fixed capacitance.
         Perform an AC sweep on the circuit and evaluate the capacitance as d/ds(i(s)/v(s))."""
-        if not settings.quiet:
-            print(f'Running input_capacitance for pin {target_pin} of cell {self.cell.name}')
+        logger.info('Running input_capacitance for pin %s of cell %s', target_pin, self.cell.name)
         vdd = settings.vdd.voltage * settings.units.voltage
         vss = settings.vss.voltage * settings.units.voltage
         # TODO: Make these values configurable from settings
@@ -261,8 +313,7 @@ class TestManager:
         circuit.R('in', circuit.gnd, 'vin', r_in)
 
         # Initialize device under test and wire up ports
-        ports = self.definition().upper().split()[1:]
-        subcircuit_name = ports.pop(0)
+        (subcircuit_name, ports) = self.definition_ports()
         connections = []
         for port in ports:
             if port == target_pin:
@@ -278,7 +329,7 @@ class TestManager:
                 connections.append(f'v{port}')
         circuit.X('dut', subcircuit_name, *connections)
 
-        simulator = Simulator.factory(simulator=settings.simulator)
+        simulator = _get_simulator(settings.simulator)
         simulation = simulator.simulation(
             circuit,
             temperature=settings.temperature,
@@ -294,9 +345,13 @@ class TestManager:
                 spice_file.write(str(simulation))
 
         # Measure capacitance as the slope of the conductance
+        # An ideal capacitor's conductance passes through the origin, so use the closed-form
+        # least-squares slope rather than a general polynomial fit
         analysis = simulation.ac('dec', 100, f_start, f_stop)
         impedance = np.abs(analysis.vin)/i_in
-        [capacitance, _] = np.polyfit(analysis.frequency, np.reciprocal(impedance)/(2*np.pi), 1)
+        frequency = np.asarray(analysis.frequency)
+        conductance = np.asarray(np.reciprocal(impedance)/(2*np.pi))
+        capacitance = np.dot(frequency, conductance) / np.dot(frequency, frequency)
 
         return capacitance
 
@@ -306,103 +361,220 @@ class CombinationalTestManager(TestManager):
 
     def characterize(self, settings):
         """Characterize a combinational cell"""
+        scales = _precompute_scales(settings)
+
         # Measure input capacitance for all input pins
         for pin in self.in_ports:
-            input_capacitance = self._run_input_capacitance(settings, pin.name) @ u_F
-            self.cell[pin.name].capacitance = input_capacitance.convert(settings.units.capacitance.prefixed_unit).value
+            self.cell[pin.name].capacitance = self._run_input_capacitance(settings, pin.name) * scales['capacitance']
 
         # Run delay simulation for all test vectors of each function
-        for out_port in self.out_ports:
-            unsorted_harnesses = []
-            # Run characterization
-            for test_vector in out_port.function.test_vectors:
-                # Map pins to test vector
-                inputs = out_port.function.operands
-                state_map = dict(zip([*inputs, out_port.name], test_vector))
-
-                # Generate harness
-                harness = CombinationalHarness(self, state_map)
-                trial_name = f'delay {self.cell.name} {harness.short_str()}'
-
-                # Run delay characterization
-                for slew in self.in_slews:
-                    for load in self.out_loads:
-                        self._run_delay(settings, harness, slew, load, trial_name)
-                unsorted_harnesses.append(harness)
-
-            # Filter out harnesses that aren't worst-case conditions
-            # We should be left with the critical path rise and fall harnesses for each i/o path
-            harnesses = []
-            for in_port in self.in_ports:
-                for direction in ['rise', 'fall']:
-                    # Iterate over harnesses that match output, input, and direction
-                    matching_harnesses = [harness for harness in filter_harnesses_by_ports(unsorted_harnesses, in_port, out_port) if harness.out_direction == direction]
-                    worst_case_harness = matching_harnesses[0]
-                    for harness in matching_harnesses:
+        with self._trial_pool(settings) as executor:
+            for out_port in self.out_ports:
+                unsorted_harnesses = []
+                trials = []
+                # Generate a harness for each test vector
+                for test_vector in out_port.function.test_vectors:
+                    # Map pins to test vector
+                    inputs = out_port.function.operands
+                    state_map = dict(zip([*inputs, out_port.name], test_vector))
+
+                    # Generate harness
+                    harness = CombinationalHarness(self, state_map)
+                    trial_name = f'delay {self.cell.name} {harness.short_str()}'
+                    context = self._prepare_delay_context(settings, harness, scales)
+                    unsorted_harnesses.append(harness)
+                    for ((i, slew), (j, load)) in product(enumerate(self.in_slews), enumerate(self.out_loads)):
+                        trials.append((harness, context, trial_name, i, slew, j, load))
+
+                # Run delay characterization for every (test vector, slew, load) combination
+                if executor is not None:
+                    futures = [executor.submit(_run_delay_worker, harness, context, slew, load, trial_name)
+                               for (harness, context, trial_name, _, slew, _, load) in trials]
+                    results = [future.result() for future in futures]
+                else:
+                    results = [self._run_delay(settings, harness, context, slew, load, trial_name)
+                               for (harness, context, trial_name, _, slew, _, load) in trials]
+                for (harness, _, _, i, _, j, _), result in zip(trials, results):
+                    harness.results[i][j] = result
+                    harness.prop[i, j] = result['prop_in_out']
+                    harness.trans[i, j] = result['trans_out']
+
+                # Filter out harnesses that aren't worst-case conditions
+                # We should be left with the critical path rise and fall harnesses for each i/o path
+                arcs = defaultdict(list)
+                for harness in unsorted_harnesses:
+                    arcs[(harness.target_in_port.pin.name, harness.out_direction)].append(harness)
+                harnesses = {}
+                for in_port in self.in_ports:
+                    for direction in ['rise', 'fall']:
                         # FIXME: Currently we compare by average prop delay. Consider alternative strategies
-                        if worst_case_harness.average_propagation_delay() < harness.average_propagation_delay():
-                            worst_case_harness = harness # This harness is worse
-                    harnesses.append(worst_case_harness)
-
-            # Store propagation and transient delay in pin timing tables
-            for in_port in self.in_ports:
-                delay_timing = TimingData(in_port.name)
-                for direction in ['rise', 'fall']:
-                    # Identify the correct harness
-                    harness = find_harness_by_arc(harnesses, in_port, out_port, direction)
-
-                    # Construct the table
-                    index_1 = [str(slew) for slew in self.in_slews]
-                    index_2 = [str(load) for load in self.out_loads]
-                    prop_values = []
-                    tran_values = []
-                    for slew in index_1:
-                        for load in index_2:
-                            result = harness.results[slew][load]
-                            prop_value = (result['prop_in_out'] @ u_s).convert(settings.units.time.prefixed_unit).value
-                            prop_values.append(f'{prop_value:7f}')
-                            tran_value = (result['trans_out'] @ u_s).convert(settings.units.time.prefixed_unit).value
-                            tran_values.append(f'{tran_value:7f}')
-                    template = TableTemplate()
-                    template.name = f'delay_template_{len(index_1)}x{len(index_2)}'
-                    template.variables = ['input_net_transition', 'total_output_net_capacitance']
-                    delay_timing.add_table(f'cell_{direction}', template, prop_values, index_1, index_2)
-                    delay_timing.add_table(f'{direction}_transition', template, tran_values, index_1, index_2)
-                self.cell[out_port.name].timings.append(delay_timing)
-
-            # Display plots
-            if 'io' in self.plots:
-                [self.plot_io(settings, harness) for harness in harnesses]
-            if 'delay' in self.plots:
-                [self.cell[out_pin.name].plot_delay(settings, self.cell.name) for out_pin in self.out_ports]
-            if 'energy' in self.plots:
-                print("Energy plotting not yet supported") # TODO: Add correct energy measurement procedure
-            if plt.get_figlabels():
-                plt.tight_layout()
-                plt.show()
+                        harnesses[(in_port.name, direction)] = max(arcs[(in_port.name, direction)],
+                                                                   key=lambda harness: harness.average_propagation_delay())
+
+                # Store propagation and transient delay in pin timing tables
+                index_1 = [str(slew) for slew in self.in_slews]
+                index_2 = [str(load) for load in self.out_loads]
+                time_scale = scales['time']
+                for in_port in self.in_ports:
+                    delay_timing = TimingData(in_port.name)
+                    for direction in ['rise', 'fall']:
+                        # Identify the correct harness
+                        harness = harnesses[(in_port.name, direction)]
+
+                        # Construct the table, converting all delays to library time units at once
+                        prop_values = np.char.mod('%7f', harness.prop * time_scale).ravel().tolist()
+                        tran_values = np.char.mod('%7f', harness.trans * time_scale).ravel().tolist()
+                        template = TableTemplate()
+                        template.name = f'delay_template_{len(index_1)}x{len(index_2)}'
+                        template.variables = ['input_net_transition', 'total_output_net_capacitance']
+                        delay_timing.add_table(f'cell_{direction}', template, prop_values, index_1, index_2)
+                        delay_timing.add_table(f'{direction}_transition', template, tran_values, index_1, index_2)
+                    self.cell[out_port.name].timings.append(delay_timing)
+
+                # Display plots
+                if 'io' in self.plots:
+                    for harness in harnesses.values():
+                        self.plot_io(settings, harness)
+                if 'delay' in self.plots:
+                    for out_pin in self.out_ports:
+                        self.cell[out_pin.name].plot_delay(settings, self.cell.name)
+                if 'energy' in self.plots:
+                    print("Energy plotting not yet supported") # TODO: Add correct energy measurement procedure
+                if self.plots:
+                    import matplotlib.pyplot as plt # Only import when needed, as matplotlib is slow to load
+                    if plt.get_figlabels():
+                        plt.tight_layout()
+                        plt.show()
 
         return self.cell
 
-    def _run_delay(self, settings, harness: CombinationalHarness, slew, load, trial_name):
-        if not settings.quiet:
-            print(f'Running {trial_name} with slew={slew*settings.units.time}, load={load*settings.units.capacitance}')
-        harness.results[str(slew)][str(load)] = self._run_delay_trial(settings, harness, slew, load)
+    def _run_delay(self, settings, harness: CombinationalHarness, context: dict, slew, load, trial_name):
+        """Run a single combinational delay trial"""
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('Running %s with slew=%s, load=%s', trial_name, slew*settings.units.time, load*settings.units.capacitance)
+        return self._run_delay_trial(settings, harness, context, slew, load)
+
+    def _prepare_delay_context(self, settings, harness: CombinationalHarness, scales: dict) -> dict:
+        """Precompute delay trial parameters which only depend on the harness and settings.
 
-    def _run_delay_trial(self, settings, harness: CombinationalHarness, slew, load):
+        scales holds the unit conversion factors from _precompute_scales."""
+        # Wire up device under test ports. These connections are the same for every trial
+        (subcircuit_name, ports) = self.definition_ports()
+        stable_states = {pin.pin.name: pin.state for pin in harness.stable_in_ports}
+        connections = []
+        for port in ports:
+            if port == harness.target_in_port.pin.name:
+                connections.append('vin')
+            elif port == harness.target_out_port.pin.name:
+                connections.append('vout')
+            elif port == settings.vdd.name.upper():
+                connections.append('vdd_dyn')
+            elif port == settings.vss.name.upper():
+                connections.append('vss_dyn')
+            elif port in stable_states:
+                state = stable_states[port]
+                if state == '1':
+                    connections.append('vhigh')
+                elif state == '0':
+                    connections.append('vlow')
+                else:
+                    raise ValueError(f'Invalid state identified during simulation setup for port {port}: {state}')
+            else:
+                connections.append('wfloat0') # Float any unrecognized ports
+
+        context = {
+            'subcircuit_name': subcircuit_name,
+            'connections': connections,
+            'scales': scales,
+            'vdd': settings.vdd.voltage / scales['voltage'],
+            'vss': settings.vss.voltage / scales['voltage'],
+            'in_direction': harness.in_direction,
+            'out_direction': harness.out_direction,
+        }
+        # Measurement thresholds, as voltages
+        pct_vdd = lambda x : x * settings.vdd.voltage
+        match harness.in_direction:
+            case 'rise':
+                context['v_prop_start'] = pct_vdd(settings.logic_threshold_low_to_high)
+            case 'fall':
+                context['v_prop_start'] = pct_vdd(settings.logic_threshold_high_to_low)
+        match harness.out_direction:
+            case 'rise':
+                context['v_prop_end'] = pct_vdd(settings.logic_threshold_low_to_high)
+                context['v_trans_start'] = pct_vdd(settings.logic_threshold_low)
+                context['v_trans_end'] = pct_vdd(settings.logic_threshold_high)
+            case 'fall':
+                context['v_prop_end'] = pct_vdd(settings.logic_threshold_high_to_low)
+                context['v_trans_start'] = pct_vdd(settings.logic_threshold_high)
+                context['v_trans_end'] = pct_vdd(settings.logic_threshold_low)
+        if settings.simulator == 'ngspice-subprocess' and 'io' not in self.plots:
+            context['deck'] = self._build_deck_template(settings, context)
+        return context
+
+    def _build_deck_template(self, settings, context: dict) -> str:
+        """Generate the spice deck for a harness's delay trials.
+
+        Everything except the input slew, output load, and simulation times is resolved here, leaving
+        format fields {t_start}, {t_end}, {t_simend}, {step}, and {c_load} to be filled in per trial."""
+        vdd = str_spice(context['vdd'])
+        vss = str_spice(context['vss'])
+        (v_start, v_end) = (vss, vdd) if context['in_direction'] == 'rise' else (vdd, vss)
+        in_direction = context['in_direction']
+        out_direction = context['out_direction']
+
+        lines = [f'.title {self.cell.name}_delay']
+        for model in self.models:
+            if isinstance(model, SpiceLibrary):
+                for device in self.used_models():
+                    lines.append(f'.include {model[device]}')
+            elif isinstance(model, Path):
+                lines.append(f'.include {model}')
+            elif isinstance(model, tuple):
+                lines.append(f'.lib {model[0]} {model[1]}')
+        lines += [
+            f'.include {self.netlist}',
+            f'Vin vin 0 PWL(0 {v_start} {{t_start}} {v_start} {{t_end}} {v_end} {{t_simend}} {v_end})',
+            f'Vhigh vhigh 0 {vdd}',
+            f'Vlow vlow 0 {vss}',
+            f'Vdd_dyn vdd_dyn 0 {vdd}',
+            f'Vss_dyn vss_dyn 0 {vss}',
+            'Vo_cap vout wout 0',
+            'C0 wout vss_dyn {c_load}',
+            f'Xdut {" ".join(context["connections"])} {context["subcircuit_name"]}',
+            f'.options temp={settings.temperature} tnom={settings.temperature}',
+            '.options autostop nopage nomod post=1 ingold=2 trtol=1',
+            f'.measure tran prop_in_out trig v(vin) val={context["v_prop_start"]} {in_direction}=1 '
+                f'targ v(vout) val={context["v_prop_end"]} {out_direction}=1',
+            f'.measure tran trans_out trig v(vout) val={context["v_trans_start"]} {out_direction}=1 '
+                f'targ v(vout) val={context["v_trans_end"]} {out_direction}=1',
+            '.tran {step} {t_simend}',
+            '.end',
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def _run_delay_trial(self, settings, harness: CombinationalHarness, context: dict, slew, load):
         """Run delay measurement for a single trial"""
-        # Set up parameters
-        data_slew = slew * settings.units.time
+        # Set up parameters as plain floats in SI units
+        scales = context['scales']
+        data_slew = slew / scales['time']
+        data_load = load / scales['capacitance']
         t_start = data_slew
         t_end = t_start + data_slew
         t_simend = 10000 * data_slew
-        vdd = settings.vdd.voltage * settings.units.voltage
-        vss = settings.vss.voltage * settings.units.voltage
+        step_time = min(self.sim_timestep / scales['time'], t_simend/1000)
+        if 'deck' in context:
+            values = {'t_start': t_start, 't_end': t_end, 't_simend': t_simend, 'step': step_time, 'c_load': data_load}
+            return self._run_deck(settings, harness, context['deck'], values, slew, load)
+        vdd = context['vdd']
+        vss = context['vss']
+        in_direction = context['in_direction']
+        out_direction = context['out_direction']
 
         # Initialize circuit
         circuit = Circuit(f'{self.cell.name}_delay')
         self._include_models(circuit)
         circuit.include(self.netlist)
-        (v_start, v_end) = (vss, vdd) if harness.in_direction == 'rise' else (vdd, vss)
+        (v_start, v_end) = (vss, vdd) if in_direction == 'rise' else (vdd, vss)
         pwl_values = [(0, v_start), (t_start, v_start), (t_end, v_end), (t_simend, v_end)]
         circuit.PieceWiseLinearVoltageSource('in', 'vin', circuit.gnd, values=pwl_values)
         circuit.V('high', 'vhigh', circuit.gnd, vdd)
@@ -410,38 +582,13 @@ class CombinationalTestManager(TestManager):
         circuit.V('dd_dyn', 'vdd_dyn', circuit.gnd, vdd)
         circuit.V('ss_dyn', 'vss_dyn', circuit.gnd, vss)
         circuit.V('o_cap', 'vout', 'wout', circuit.gnd)
-        circuit.C('0', 'wout', 'vss_dyn', load * settings.units.capacitance)
+        circuit.C('0', 'wout', 'vss_dyn', data_load)
 
-        # Initialize device under test subcircuit and wire up ports
-        ports = self.definition().upper().split()[1:]
-        subcircuit_name = ports.pop(0)
-        connections = []
-        for port in ports:
-            if port == harness.target_in_port.pin.name:
-                connections.append('vin')
-            elif port == harness.target_out_port.pin.name:
-                connections.append('vout')
-            elif port == settings.vdd.name.upper():
-                connections.append('vdd_dyn')
-            elif port == settings.vss.name.upper():
-                connections.append('vss_dyn')
-            elif port in [pin.pin.name for pin in harness.stable_in_ports]:
-                for stable_port in harness.stable_in_ports:
-                    if port == stable_port.pin.name:
-                        if stable_port.state == '1':
-                            connections.append('vhigh')
-                        elif stable_port.state == '0':
-                            connections.append('vlow')
-                        else:
-                            raise ValueError(f'Invalid state identified during simulation setup for port {port}: {state}')
-            else:
-                connections.append('wfloat0') # Float any unrecognized ports
-        if len(connections) is not len(ports):
-            raise ValueError(f'Failed to match all ports identified in definition "{self.definition().strip()}"')
-        circuit.X('dut', subcircuit_name, *connections)
+        # Initialize device under test subcircuit
+        circuit.X('dut', context['subcircuit_name'], *context['connections'])
 
         # Initialize simulation
-        simulator = Simulator.factory(simulator=settings.simulator)
+        simulator = _get_simulator(settings.simulator)
         simulation = simulator.simulation(
             circuit,
             temperature=settings.temperature,
@@ -450,31 +597,16 @@ class CombinationalTestManager(TestManager):
         simulation.options('autostop', 'nopage', 'nomod', post=1, ingold=2, trtol=1)
 
         # Measure delay
-        pct_vdd = lambda x : x * settings.vdd.voltage
-        match harness.in_direction:
-            case 'rise':
-                v_prop_start = settings.logic_threshold_low_to_high
-            case 'fall':
-                v_prop_start = settings.logic_threshold_high_to_low
-        match harness.out_direction:
-            case 'rise':
-                v_prop_end = settings.logic_threshold_low_to_high
-                v_trans_start = settings.logic_threshold_low
-                v_trans_end = settings.logic_threshold_high
-            case 'fall':
-                v_prop_end = settings.logic_threshold_high_to_low
-                v_trans_start = settings.logic_threshold_high
-                v_trans_end = settings.logic_threshold_low
         simulation.measure(
             'tran', 'prop_in_out',
-            f'trig v(vin) val={pct_vdd(v_prop_start)} {harness.in_direction}=1',
-            f'targ v(vout) val={pct_vdd(v_prop_end)} {harness.out_direction}=1',
+            f'trig v(vin) val={context["v_prop_start"]} {in_direction}=1',
+            f'targ v(vout) val={context["v_prop_end"]} {out_direction}=1',
             run=False
         )
         simulation.measure(
             'tran', 'trans_out',
-            f'trig v(vout) val={pct_vdd(v_trans_start)} {harness.out_direction}=1',
-            f'targ v(vout) val={pct_vdd(v_trans_end)} {harness.out_direction}=1',
+            f'trig v(vout) val={context["v_trans_start"]} {out_direction}=1',
+            f'targ v(vout) val={context["v_trans_end"]} {out_direction}=1',
             run=False
         )
 
@@ -489,15 +621,40 @@ class CombinationalTestManager(TestManager):
 
         # Run transient analysis
         # TODO: May need to add probes before running?
-        step_time = min(self.sim_timestep*settings.units.time, t_simend/1000)
         return simulation.transient(step_time=step_time, end_time=t_simend)
 
+    def _run_deck(self, settings, harness: CombinationalHarness, deck: str, values: dict, slew, load) -> dict:
+        """Fill in a delay deck template with values and run it with ngspice in batch mode.
+
+        Returns a dict of the measurements reported by ngspice."""
+        deck = deck.format(**{key: str_spice(value) for (key, value) in values.items()})
+
+        # Log simulation
+        # Path should be debug_dir/cell_name/delay/arc/slew/load/
+        if settings.debug:
+            debug_path = settings.debug_dir / self.cell.name / 'delay' / harness.debug_path / \
+                         f'slew_{slew}' / f'load_{load}'
+            debug_path.mkdir(parents=True, exist_ok=True)
+            with open(debug_path/'delay.sp', 'w') as spice_file:
+                spice_file.write(deck)
+
+        # Pipe the deck straight to ngspice and scan its raw output for measurements
+        process = subprocess.Popen([settings.ngspice_path, '-b'], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+        (output, errors) = process.communicate(deck.encode())
+        measurements = {name.decode(): float(value) for (name, value) in _MEASURE_RE.findall(output)}
+        if process.returncode or 'prop_in_out' not in measurements or 'trans_out' not in measurements:
+            raise ValueError(f'ngspice failed to measure delays for {harness.short_str()} with slew={slew}, '
+                             f'load={load} (exit code {process.returncode}):\n{errors.decode(errors="replace").strip()}')
+        return measurements
+
     def plot_io(self, settings, harness):
         """Plot I/O voltages vs time"""
+        import matplotlib.pyplot as plt
         # TODO: Look for ways to generate fewer plots here - maybe a creative 3D plot
         figures = []
         # Group data by slew rate so that inputs are the same
-        for slew in self.in_slews:
+        for (i, slew) in enumerate(self.in_slews):
             # Generate plots for Vin and Vout
             figure, (ax_i, ax_o) = plt.subplots(2,
                 sharex=True,
@@ -514,8 +671,8 @@ class CombinationalTestManager(TestManager):
                 ylabel=f'Vout (pin {harness.target_out_port.pin.name}) [{volt_units}]',
                 xlabel=f'Time [{time_units}]'
             )
-            for load in self.out_loads:
-                analysis = harness.results[str(slew)][str(load)]
+            for (j, load) in enumerate(self.out_loads):
+                analysis = harness.results[i][j]
                 ax_o.plot(analysis.time / settings.units.time, analysis.vout, label=f'Fanout={load*settings.units.capacitance}')
             ax_o.legend()
             ax_i.plot(analysis.time / settings.units.time, analysis.vin)
@@ -552,7 +709,7 @@ class SequentialTestManager(TestManager):
     @property
     def clock(self) -> Pin:
         """Return clock pin"""
-        return self.cell[self.clock_name]
+        return self._clock
 
     @property
     def clock_name(self) -> str:
@@ -570,6 +727,8 @@ class SequentialTestManager(TestManager):
         (self._clock_trigger, pin) = _parse_triggered_pin(value, 'clock')
         self._clock_name = pin.name
         self.cell.add_pin(pin.name, pin.direction, pin.role)
+        self._clock = self.cell[pin.name]
+        self._refresh_port_caches()
 
     @property
     def clock_slew(self) -> float:
@@ -581,7 +740,7 @@ class SequentialTestManager(TestManager):
     @property
     def set(self):
         """Return set pin"""
-        return self.cell.pins.get(self.set_name)
+        return self._set
 
     @property
     def set_name(self) -> str:
@@ -600,13 +759,16 @@ class SequentialTestManager(TestManager):
             (self._set_trigger, pin) = _parse_triggered_pin(value, 'set')
             self._set_name = pin.name
             self.cell.add_pin(pin.name, pin.direction, pin.role)
+            self._set = self.cell[pin.name]
+            self._refresh_port_caches()
         else:
             self._set_name = None
+            self._set = None
 
     @property
     def reset(self):
         """Return reset pin"""
-        return self.cell.pins.get(self.reset_name)
+        return self._reset
 
     @property
     def reset_name(self) -> str:
@@ -625,8 +787,31 @@ class SequentialTestManager(TestManager):
             (self._reset_trigger, pin) = _parse_triggered_pin(value, 'reset')
             self._reset_name = pin.name
             self.cell.add_pin(pin.name, pin.direction, pin.role)
+            self._reset = self.cell[pin.name]
+            self._refresh_port_caches()
         else:
             self._reset_name = None
+            self._reset = None
+
+    @property
+    def setup_time_range(self) -> tuple:
+        """Return (min, max) setup times to search, in library time units"""
+        return self._setup_time_range
+
+    @setup_time_range.setter
+    def setup_time_range(self, value):
+        """Set setup time search range"""
+        self._setup_time_range = _parse_time_range(value, 'setup')
+
+    @property
+    def hold_time_range(self) -> tuple:
+        """Return (min, max) hold times to search, in library time units"""
+        return self._hold_time_range
+
+    @hold_time_range.setter
+    def hold_time_range(self, value):
+        """Set hold time search range"""
+        self._hold_time_range = _parse_time_range(value, 'hold')
 
     @property
     def flops(self) -> list:
@@ -651,99 +836,113 @@ class SequentialTestManager(TestManager):
             in_cap_pins += [self.set]
         if self.reset:
             in_cap_pins += [self.reset]
+        scales = _precompute_scales(settings)
         for pin in in_cap_pins:
-            input_capacitance = self._run_input_capacitance(settings, pin.name) @ u_F
-            self.cell[pin.name].capacitance = input_capacitance.convert(settings.units.capacitance.prefixed_unit).value
+            self.cell[pin.name].capacitance = self._run_input_capacitance(settings, pin.name) * scales['capacitance']
 
         # Save test results to cell
-        normalize_t_units = lambda value: (value @ u_s).convert(settings.units.time.prefixed_unit).value
-
-        for out_port in self.out_ports:
-            unsorted_harnesses = []
-            # Generate Harnesses and run characterization
-            for test_vector in out_port.function.test_vectors:
-                # Map pins
-                inputs = out_port.function.operands
-                state_map = dict(zip([*inputs, out_port.name], test_vector))
-                state_map[self.clock.name] = '0101' if self.clock_trigger == 'posedge' else '1010'
-                if self.set:
-                    state_map[self.set.name] = '0' if self.set_trigger == 'posedge' else '1'
-                if self.reset:
-                    state_map[self.reset.name] = '0' if self.reset_trigger == 'posedge' else '1'
-                # TODO: Add flops
-
-                # Generate harness
-                harness = SequentialHarness(self, state_map)
-                trial_name = f'delay {self.cell.name} {harness.short_str()}'
-
-                # Run characterization
-                for slew in self.in_slews:
-                    for load in self.out_loads:
-                        harness.results[str(slew)][str(load)] = self._run_delay(settings, harness, slew, load, trial_name)
-                unsorted_harnesses.append(harness)
-
-            # TODO: Filter out harnesses that aren't worst-case conditions
-            harnesses = unsorted_harnesses
-
-            # Store timing results
-            for in_port in self.in_ports: # TODO: Add set and reset
+        time_scale = scales['time']
+
+        # Clock, set, and reset states are the same for every test vector
+        control_states = {self.clock.name: '0101' if self.clock_trigger == 'posedge' else '1010'}
+        if self.set:
+            control_states[self.set.name] = '0' if self.set_trigger == 'posedge' else '1'
+        if self.reset:
+            control_states[self.reset.name] = '0' if self.reset_trigger == 'posedge' else '1'
+        # TODO: Add flops
+
+        with self._trial_pool(settings) as executor:
+            for out_port in self.out_ports:
+                unsorted_harnesses = []
+                trials = []
+                pin_names = [*out_port.function.operands, out_port.name]
+                # Generate Harnesses
+                for test_vector in out_port.function.test_vectors:
+                    # Map pins
+                    state_map = dict(zip(pin_names, test_vector))
+                    state_map.update(control_states)
+
+                    # Generate harness
+                    harness = SequentialHarness(self, state_map)
+                    trial_name = f'delay {self.cell.name} {harness.short_str()}'
+                    unsorted_harnesses.append(harness)
+                    for ((i, slew), (j, load)) in product(enumerate(self.in_slews), enumerate(self.out_loads)):
+                        trials.append((harness, trial_name, i, slew, j, load))
+
+                # Run characterization for every (test vector, slew, load) combination
+                if executor is not None:
+                    futures = [executor.submit(_run_sequential_delay_worker, harness, slew, load, trial_name)
+                               for (harness, trial_name, _, slew, _, load) in trials]
+                    results = [future.result() for future in futures]
+                else:
+                    results = [self._run_delay(settings, harness, slew, load, trial_name)
+                               for (harness, trial_name, _, slew, _, load) in trials]
+                for (harness, _, i, _, j, _), result in zip(trials, results):
+                    harness.results[i][j] = result
+
+                # TODO: Filter out harnesses that aren't worst-case conditions
+                harnesses = unsorted_harnesses
+
+                # Set up table indices and templates, which are shared by all input ports
                 index_1 = [str(slew) for slew in self.in_slews]
                 index_2 = [str(load) for load in self.out_loads]
-
-                # Set up timing groups and table templates
                 clock_edge = 'rising' if self.clock_trigger == 'posedge' else 'falling'
                 delay_template = TableTemplate()
                 delay_template.name = f'delay_template_{len(index_1)}x{len(index_2)}'
                 delay_template.variables = ['input_net_transition', 'total_output_net_capacitance']
-                delay_timing = TimingData(out_port.name, f'{clock_edge}_edge')
                 setup_template = TableTemplate()
                 setup_template.name = f'setup_template_{len(index_1)}x{len(index_2)}'
                 setup_template.variables = ['related_pin_transition', 'constrained_pin_transition']
-                setup_timing = TimingData(self.clock_name, f'setup_{clock_edge}')
                 hold_template = TableTemplate()
                 hold_template.name = f'hold_template_{len(index_1)}x{len(index_2)}'
                 hold_template.variables = setup_template.variables
-                hold_timing = TimingData(self.clock_name, f'hold_{clock_edge}')
-                for direction in ['rise', 'fall']:
-                    # Fetch and format data for timing tables
-                    harness = find_harness_by_arc(harnesses, in_port, out_port, direction)
-                    prop_values = []
-                    tran_values = []
-                    setup_values = []
-                    hold_values = []
-                    for slew in index_1:
-                        for load in index_2:
-                            result = harness.results[slew][load]
-                            prop_values.append(f'{normalize_t_units(result["prop_in_out"]):7f}')
-                            tran_values.append(f'{normalize_t_units(result["trans_out"]):7f}')
-                            setup_values.append(f'{normalize_t_units(result["t_setup"]):7f}')
-                            hold_values.append(f'{normalize_t_units(result["t_hold"]):7f}')
-
-                    # Store propagation and transient delays on the output pin
-                    delay_timing.add_table(f'cell_{direction}', delay_template, prop_values, index_1, index_2)
-                    delay_timing.add_table(f'{direction}_transition', delay_template, tran_values, index_1, index_2)
-
-                    # Store setup and hold constraints on the input pin
-                    setup_timing.add_table(f'{direction}_constraint', setup_template, setup_values, index_1, index_2)
-                    hold_timing.add_table(f'{direction}_constraint', hold_template, hold_values, index_1, index_2)
-
-                # Add timing groups to pins
-                self.cell[out_port.name].timings.append(delay_timing)
-                self.cell[in_port.name].timings.append(setup_timing)
-                self.cell[in_port.name].timings.append(hold_timing)
-
-            # TODO: Store internal power results
-
-            # Display plots
-            if 'io' in self.plots:
-                [self.plot_io(settings, harness) for harness in harnesses]
-            if 'delay' in self.plots:
-                [self.cell[out_pin.name].plot_delay(settings, self.cell.name) for out_pin in self.out_ports]
-            if 'energy' in self.plots:
-                pass # TODO
-            if plt.get_figlabels():
-                plt.tight_layout()
-                plt.show()
+                # Buffer for each table's measurements, in seconds, reused for every harness
+                measurements = ['prop_in_out', 'trans_out', 't_setup', 't_hold']
+                table_buffer = np.empty((len(measurements), len(index_1) * len(index_2)))
+
+                # Store timing results
+                for in_port in self.in_ports: # TODO: Add set and reset
+                    # Set up timing groups
+                    delay_timing = TimingData(out_port.name, f'{clock_edge}_edge')
+                    setup_timing = TimingData(self.clock_name, f'setup_{clock_edge}')
+                    hold_timing = TimingData(self.clock_name, f'hold_{clock_edge}')
+                    for direction in ['rise', 'fall']:
+                        # Fetch and format data for timing tables
+                        harness = find_harness_by_arc(harnesses, in_port, out_port, direction)
+                        for (k, result) in enumerate(chain.from_iterable(harness.results)):
+                            table_buffer[:, k] = [result[key] for key in measurements]
+                        (prop_values, tran_values, setup_values, hold_values) = \
+                            np.char.mod('%7f', table_buffer * time_scale).tolist()
+
+                        # Store propagation and transient delays on the output pin
+                        delay_timing.add_table(f'cell_{direction}', delay_template, prop_values, index_1, index_2)
+                        delay_timing.add_table(f'{direction}_transition', delay_template, tran_values, index_1, index_2)
+
+                        # Store setup and hold constraints on the input pin
+                        setup_timing.add_table(f'{direction}_constraint', setup_template, setup_values, index_1, index_2)
+                        hold_timing.add_table(f'{direction}_constraint', hold_template, hold_values, index_1, index_2)
+
+                    # Add timing groups to pins
+                    self.cell[out_port.name].timings.append(delay_timing)
+                    self.cell[in_port.name].timings.append(setup_timing)
+                    self.cell[in_port.name].timings.append(hold_timing)
+
+                # TODO: Store internal power results
+
+                # Display plots
+                if 'io' in self.plots:
+                    for harness in harnesses:
+                        self.plot_io(settings, harness)
+                if 'delay' in self.plots:
+                    for out_pin in self.out_ports:
+                        self.cell[out_pin.name].plot_delay(settings, self.cell.name)
+                if 'energy' in self.plots:
+                    pass # TODO
+                if self.plots:
+                    import matplotlib.pyplot as plt
+                    if plt.get_figlabels():
+                        plt.tight_layout()
+                        plt.show()
 
         return self.cell
 
@@ -755,8 +954,7 @@ class SequentialTestManager(TestManager):
         debug_path = settings.debug_dir / self.cell.name / 'delay' / harness.debug_path / \
                      f'slew_{slew}' / f'load_{load}'
 
-        if not settings.quiet:
-            print(f'Running sequential {trial_name} with slew={str(t_slew)}, load={str(c_load)}')
+        logger.info('Running sequential %s with slew=%s, load=%s', trial_name, t_slew, c_load)
         t_stab = self._find_stabilizing_time(settings, harness, t_slew, c_load, debug_path)
         (t_setup, t_hold) = self._find_setup_hold_delay(settings, harness, t_slew, c_load, t_stab, debug_path)
 
@@ -773,23 +971,26 @@ class SequentialTestManager(TestManager):
         total simulation time."""
         # Run a single simulation and measure the time it takes for the Q output to change from 1%
         # of vdd to 99% of vdd
-        t_stab = 500 * max(self.in_slews) * settings.units.time
-        t_setup = max(self.setup_time_range) * settings.units.time
-        t_hold = max(self.hold_time_range) * settings.units.time
+        time_unit = settings.units.time
+        t_stab = 500 * max(self.in_slews) * time_unit
+        t_setup = self.setup_time_range[1] * time_unit
+        t_hold = self.hold_time_range[1] * time_unit
         sim, t = self._build_test_circuit('stabilizing', settings, harness, t_slew, c_load, t_setup, t_hold, t_stab)
 
         # Measure time it takes for Q to stabilize
-        match harness.out_direction:
+        vdd = settings.vdd.voltage
+        out_direction = harness.out_direction
+        match out_direction:
             case 'rise':
-                v_start = 0.01 * settings.vdd.voltage
-                v_end = 0.99 * settings.vdd.voltage
+                v_start = 0.01 * vdd
+                v_end = 0.99 * vdd
             case 'fall':
-                v_start = 0.99 * settings.vdd.voltage
-                v_end = 0.01 * settings.vdd.voltage
+                v_start = 0.99 * vdd
+                v_end = 0.01 * vdd
         sim.measure(
             'tran', 't_stabilizing',
-            f'trig v(vout) val={v_start} {harness.out_direction}=1',
-            f'targ v(vout) val={v_end} {harness.out_direction}=1',
+            f'trig v(vout) val={v_start} {out_direction}=1',
+            f'targ v(vout) val={v_end} {out_direction}=1',
             run=False
         )
 
@@ -809,15 +1010,19 @@ class SequentialTestManager(TestManager):
         Calculate the minimum setup and hold time for the current configuration, accounting for
         interdependence between the two. Uses the procedure proposed by Salman et. al.; See
         https://ieeexplore.ieee.org/document/4167994"""
+        # The four sweeps may revisit the same (t_setup, t_hold) points, so share pass/fail results
+        c2q_cache = {}
+
         # Identify msp
-        th = max(self.hold_time_range) * settings.units.time
-        t_setup_min = self._sweep_ts(settings, harness, t_slew, c_load, t_stabilizing, th, 'ts_min', debug_path)
-        t_hold_max = self._sweep_th(settings, harness, t_slew, c_load, t_stabilizing, t_setup_min, 'th_max', debug_path)
+        time_unit = settings.units.time
+        th = self.hold_time_range[1] * time_unit
+        t_setup_min = self._sweep_ts(settings, harness, t_slew, c_load, t_stabilizing, th, 'ts_min', debug_path, c2q_cache)
+        t_hold_max = self._sweep_th(settings, harness, t_slew, c_load, t_stabilizing, t_setup_min, 'th_max', debug_path, c2q_cache)
 
         # Identify mhp
-        ts = max(self.setup_time_range) * settings.units.time
-        t_hold_min = self._sweep_th(settings, harness, t_slew, c_load, t_stabilizing, ts, 'th_min', debug_path)
-        t_setup_max = self._sweep_ts(settings, harness, t_slew, c_load, t_stabilizing, t_hold_min, 'ts_max', debug_path)
+        ts = self.setup_time_range[1] * time_unit
+        t_hold_min = self._sweep_th(settings, harness, t_slew, c_load, t_stabilizing, ts, 'th_min', debug_path, c2q_cache)
+        t_setup_max = self._sweep_ts(settings, harness, t_slew, c_load, t_stabilizing, t_hold_min, 'ts_max', debug_path, c2q_cache)
 
         # Interpolate mshp along the contour formed by msp, mhp
         # For now we use a simple average, which may be overly pessimistic
@@ -825,67 +1030,88 @@ class SequentialTestManager(TestManager):
         mshp = (1.4*(t_setup_min+t_setup_max)/2, (t_hold_min+t_hold_max)/2)
         return mshp
 
-    def _sweep_ts(self, settings, harness, t_slew, c_load, t_stabilizing, t_hold, title, debug_path):
-        """Perform a binary search to find the minimum viable t_setup with the given t_hold"""
-        t_step = self.sim_timestep * settings.units.time
-        ts_max = max(self.setup_time_range) * settings.units.time
-        ts_min = min(self.setup_time_range) * settings.units.time
-        ts = ts_max
-        i = 0
-        while ts - ts_min > t_step:
-            i += 1
-            sim, t = self._build_test_circuit(f'{title}_{i}', settings, harness, t_slew, c_load, ts, t_hold, t_stabilizing)
+    def _check_c2q(self, settings, harness, t_slew, c_load, t_stabilizing, t_setup, t_hold, title, debug_path, cache) -> bool:
+        """Return whether the cell latches data with the given t_setup and t_hold.
+
+        Results are stored in cache, keyed by setup and hold time rounded to the simulation
+        timestep, so that repeated points don't require another simulation."""
+        t_step = float(self.sim_timestep * settings.units.time)
+        key = (round(float(t_setup) / t_step), round(float(t_hold) / t_step))
+        if key not in cache:
+            sim, t = self._build_test_circuit(title, settings, harness, t_slew, c_load, t_setup, t_hold, t_stabilizing)
             try:
                 self._measure_c2q(settings, harness, sim, t, debug_path)
+                cache[key] = True
             except NameError:
-                ts_min = ts
-                ts = (ts_max + ts_min) / 2
-                continue
-            ts_max = ts
+                cache[key] = False
+        return cache[key]
+
+    def _sweep_ts(self, settings, harness, t_slew, c_load, t_stabilizing, t_hold, title, debug_path, cache):
+        """Perform a binary search to find the minimum viable t_setup with the given t_hold"""
+        time_unit = settings.units.time
+        t_step = self.sim_timestep * time_unit
+        (ts_min, ts_max) = [t * time_unit for t in self.setup_time_range]
+        # If even the upper bound fails, there's nothing to search for. Checks are cached, so this
+        # is free when another sweep has already probed the same point
+        if not self._check_c2q(settings, harness, t_slew, c_load, t_stabilizing, ts_max, t_hold, f'{title}_0', debug_path, cache):
+            return ts_max
+        # Stop once the next midpoint would be within one timestep
+        i = 0
+        while (ts_max - ts_min) / 2 > t_step:
+            i += 1
             ts = (ts_max + ts_min) / 2
+            if self._check_c2q(settings, harness, t_slew, c_load, t_stabilizing, ts, t_hold, f'{title}_{i}', debug_path, cache):
+                ts_max = ts
+            else:
+                ts_min = ts
         return ts_max
 
-    def _sweep_th(self, settings, harness, t_slew, c_load, t_stabilizing, t_setup, title, debug_path):
+    def _sweep_th(self, settings, harness, t_slew, c_load, t_stabilizing, t_setup, title, debug_path, cache):
         """Perform a binary search to find the minimum viable t_hold with the given t_setup"""
-        t_step = self.sim_timestep * settings.units.time
-        th_max = max(self.hold_time_range) * settings.units.time
-        th_min = min(self.hold_time_range) * settings.units.time
-        th = th_max
+        time_unit = settings.units.time
+        t_step = self.sim_timestep * time_unit
+        (th_min, th_max) = [t * time_unit for t in self.hold_time_range]
+        # If even the upper bound fails, there's nothing to search for. Checks are cached, so this
+        # is free when another sweep has already probed the same point
+        if not self._check_c2q(settings, harness, t_slew, c_load, t_stabilizing, t_setup, th_max, f'{title}_0', debug_path, cache):
+            return th_max
+        # Stop once the next midpoint would be within one timestep
         i = 0
-        while th - th_min > t_step:
+        while (th_max - th_min) / 2 > t_step:
             i += 1
-            sim, t = self._build_test_circuit(f'{title}_{i}', settings, harness, t_slew, c_load, t_setup, th, t_stabilizing)
-            try:
-                self._measure_c2q(settings, harness, sim, t, debug_path)
-            except NameError:
-                th_min = th
-                th = (th_max + th_min) / 2
-                continue
-            th_max = th
             th = (th_max + th_min) / 2
+            if self._check_c2q(settings, harness, t_slew, c_load, t_stabilizing, t_setup, th, f'{title}_{i}', debug_path, cache):
+                th_max = th
+            else:
+                th_min = th
         return th_max
 
     def _build_test_circuit(self, title, settings, harness, t_slew, c_load, t_setup, t_hold, t_stabilizing):
         """Construct the circuit simulation object with the provided test parameters"""
         # Set up parameters
         clk_slew = self.clock_slew * settings.units.time
-        vdd = settings.vdd.voltage * settings.units.voltage
-        vss = settings.vss.voltage * settings.units.voltage
+        voltage_unit = settings.units.voltage
+        vdd = settings.vdd.voltage * voltage_unit
+        vss = settings.vss.voltage * voltage_unit
 
         # Set up timing parameters for clock and data events
-        t = {}
-        t['clk_edge_1_start'] = t_setup
-        t['clk_edge_1_end'] = t['clk_edge_1_start'] + clk_slew
-        t['clk_edge_2_start'] = t['clk_edge_1_end'] + max(t_setup, t_hold)
-        t['clk_edge_2_end'] = t['clk_edge_2_start'] + clk_slew
-        t['removal'] = t['clk_edge_2_end'] + t_hold # initial state has now been zeroed out
-        t['data_edge_1_start'] = t['removal'] + t_stabilizing # wait for the system to stabilize
-        t['data_edge_1_end'] = t['data_edge_1_start'] + t_slew
-        t['clk_edge_3_start'] = t['data_edge_1_start'] + t_slew/2 + t_setup + clk_slew/2
-        t['clk_edge_3_end'] = t['clk_edge_3_start'] + clk_slew
-        t['data_edge_2_start'] = t['clk_edge_3_start'] + clk_slew/2 + t_hold + t_slew/2
-        t['data_edge_2_end'] = t['data_edge_2_start'] + t_slew
-        t['sim_end'] = t['data_edge_2_end'] + 2*t_stabilizing # wait for the system to stabilize
+        clk_edge_1_start = t_setup
+        clk_edge_1_end = clk_edge_1_start + clk_slew
+        clk_edge_2_start = clk_edge_1_end + max(t_setup, t_hold)
+        clk_edge_2_end = clk_edge_2_start + clk_slew
+        removal = clk_edge_2_end + t_hold # initial state has now been zeroed out
+        data_edge_1_start = removal + t_stabilizing # wait for the system to stabilize
+        data_edge_1_end = data_edge_1_start + t_slew
+        clk_edge_3_start = data_edge_1_start + t_slew/2 + t_setup + clk_slew/2
+        clk_edge_3_end = clk_edge_3_start + clk_slew
+        data_edge_2_start = clk_edge_3_start + clk_slew/2 + t_hold + t_slew/2
+        data_edge_2_end = data_edge_2_start + t_slew
+        sim_end = data_edge_2_end + 2*t_stabilizing # wait for the system to stabilize
+        t = dict(clk_edge_1_start=clk_edge_1_start, clk_edge_1_end=clk_edge_1_end,
+                 clk_edge_2_start=clk_edge_2_start, clk_edge_2_end=clk_edge_2_end, removal=removal,
+                 data_edge_1_start=data_edge_1_start, data_edge_1_end=data_edge_1_end,
+                 clk_edge_3_start=clk_edge_3_start, clk_edge_3_end=clk_edge_3_end,
+                 data_edge_2_start=data_edge_2_start, data_edge_2_end=data_edge_2_end, sim_end=sim_end)
 
         # Initialize circuit
         circuit = Circuit(title)
@@ -900,27 +1126,16 @@ class SequentialTestManager(TestManager):
 
         # Set up clock input
         (v0, v1) = (vdd, vss) if harness.timing_type_clock == 'falling_edge' else (vss, vdd)
-        circuit.PieceWiseLinearVoltageSource('cin', 'vcin', circuit.gnd, values=[
-            (0, v0),
-            (t['clk_edge_1_start'], v0),
-            (t['clk_edge_1_end'], v1),
-            (t['clk_edge_2_start'], v1),
-            (t['clk_edge_2_end'], v0),
-            (t['clk_edge_3_start'], v0),
-            (t['clk_edge_3_end'], v1),
-            (t['sim_end'], v1)
-        ])
+        clk_times = [0, clk_edge_1_start, clk_edge_1_end, clk_edge_2_start, clk_edge_2_end,
+                     clk_edge_3_start, clk_edge_3_end, sim_end]
+        clk_levels = [v0, v0, v1, v1, v0, v0, v1, v1]
+        circuit.PieceWiseLinearVoltageSource('cin', 'vcin', circuit.gnd, values=list(zip(clk_times, clk_levels)))
 
         # Set up data input node
         (v0, v1) = (vss, vdd) if harness.in_direction == 'rise' else (vdd, vss)
-        circuit.PieceWiseLinearVoltageSource('in', 'vin', circuit.gnd, values=[
-            (0, v0),
-            (t['data_edge_1_start'], v0),
-            (t['data_edge_1_end'], v1),
-            (t['data_edge_2_start'], v1),
-            (t['data_edge_2_end'], v0),
-            (t['sim_end'], v0)
-        ])
+        data_times = [0, data_edge_1_start, data_edge_1_end, data_edge_2_start, data_edge_2_end, sim_end]
+        data_levels = [v0, v0, v1, v1, v0, v0]
+        circuit.PieceWiseLinearVoltageSource('in', 'vin', circuit.gnd, values=list(zip(data_times, data_levels)))
 
         # Set up set and reset node
         if harness.reset:
@@ -928,41 +1143,11 @@ class SequentialTestManager(TestManager):
         if harness.set:
             circuit.V('sin', 'vsin', circuit.gnd, vdd if harness.set.state == '1' else vss)
 
-        # Initialize device under test subcircuit and wire up ports
-        ports = self.definition().upper().split()[1:]
-        connections = [ports.pop(0)]
-        for port in ports:
-            if port == harness.target_in_port.pin.name:
-                connections.append('vin')
-            elif port == harness.target_out_port.pin.name:
-                connections.append('vout')
-            elif port == settings.vdd.name.upper():
-                connections.append('vdd_dyn')
-            elif port == settings.vss.name.upper():
-                connections.append('vss_dyn')
-            elif port == harness.clock.pin.name:
-                connections.append('vcin')
-            elif self.reset and port == harness.reset.pin.name:
-                connections.append('vrin')
-            elif self.set and port == harness.set.pin.name:
-                connections.append('vsin')
-            elif port in [pin.pin.name for pin in harness.stable_in_ports]:
-                for stable_port in harness.stable_in_ports:
-                    if port == stable_port.pin.name:
-                        if stable_port.state == '1':
-                            connections.append('vhigh')
-                        elif stable_port.state == '0':
-                            connections.append('vlow')
-                        else:
-                            raise ValueError(f'Invalid state identified during simulation setup for port {port}: {state}')
-            else:
-                connections.append('wfloat0') # Float any unrecognized ports
-        if len(connections) is not len(ports)+1:
-            raise ValueError(f'Failed to match all ports identified in definition "{self.definition().strip()}"')
-        circuit.X('dut', *connections)
+        # Initialize device under test subcircuit
+        circuit.X('dut', *self._wire_subcircuit(settings, harness))
 
         # Initialize simulation
-        simulator = Simulator.factory(simulator=settings.simulator)
+        simulator = _get_simulator(settings.simulator)
         simulation = simulator.simulation(
             circuit,
             temperature=settings.temperature,
@@ -971,6 +1156,39 @@ class SequentialTestManager(TestManager):
 
         return simulation, t
 
+    def _wire_subcircuit(self, settings, harness) -> list:
+        """Return the subcircuit name followed by the node connected to each of its ports.
+
+        The wiring only depends on the harness, so it is computed once and cached there."""
+        if harness.connections is not None:
+            return harness.connections
+        (subcircuit_name, ports) = self.definition_ports()
+
+        # Map port names to nodes. Later entries take precedence, so target ports win over
+        # supplies, which win over control pins and stable inputs
+        nodes = {}
+        for stable_port in harness.stable_in_ports:
+            match stable_port.state:
+                case '1':
+                    nodes[stable_port.pin.name] = 'vhigh'
+                case '0':
+                    nodes[stable_port.pin.name] = 'vlow'
+                case _:
+                    raise ValueError(f'Invalid state identified during simulation setup for port {stable_port.pin.name}: {stable_port.state}')
+        if harness.set:
+            nodes[harness.set.pin.name] = 'vsin'
+        if harness.reset:
+            nodes[harness.reset.pin.name] = 'vrin'
+        nodes[harness.clock.pin.name] = 'vcin'
+        nodes[settings.vss.name.upper()] = 'vss_dyn'
+        nodes[settings.vdd.name.upper()] = 'vdd_dyn'
+        nodes[harness.target_out_port.pin.name] = 'vout'
+        nodes[harness.target_in_port.pin.name] = 'vin'
+
+        # Float any unrecognized ports
+        harness.connections = [subcircuit_name, *[nodes.get(port, 'wfloat0') for port in ports]]
+        return harness.connections
+
     def _measure_cell_delays(self, settings, harness, simulation, timings, debug_path):
         """Run delay measurement for a single test circuit."""
 
@@ -1075,89 +1293,134 @@ class SequentialTestManager(TestManager):
 
     def plot_io(self, settings, harness):
         """Plot I/O voltages vs time"""
+        import matplotlib.pyplot as plt
         # TODO: Look for ways to generate fewer plots here - maybe a creative 3D plot
         figures = []
+        # Add axes for clk, s, r, d, q (in that order), skipping set and reset if they aren't present
+        # Each entry maps an axis label to the node it plots
+        signals = [('CLK', 'vcin')]
+        if self.set:
+            signals.append(('S', 'vsin'))
+        if self.reset:
+            signals.append(('R', 'vrin'))
+        signals += [('D', 'vin'), ('Q', 'vout')]
+        ratios = [1] * (len(signals) - 1) + [len(signals)]
+        volt_units = str(settings.units.voltage.prefixed_unit)
+        time_units = str(settings.units.time.prefixed_unit)
+
+        figure_label = f'{self.cell.name} | {harness.short_str()}'
+
         # Group data by slew rate so that inputs are the same
-        for slew in self.in_slews:
-            for load in self.out_loads:
-                # Add axes for clk, s, r, d, q (in that order)
-                # Use an additive approach in case some of those aren't present
-                num_axes = 1
-                CLK = 0
-                if self.set:
-                    S = num_axes
-                    num_axes += 1
-                if self.reset:
-                    R = num_axes
-                    num_axes += 1
-                D = num_axes
-                num_axes += 1
-                Q = num_axes
-                num_axes += 1
-                ratios = np.ones(num_axes).tolist()
-                ratios[-1] = num_axes
-                figure, axes = plt.subplots(num_axes,
+        for (i, slew) in enumerate(self.in_slews):
+            for (j, load) in enumerate(self.out_loads):
+                figure, axes = plt.subplots(len(signals),
                     sharex=True,
                     height_ratios=ratios,
-                    label=f'{self.cell.name} | {harness.short_str()}'
+                    label=figure_label
                 )
+                axes[0].set_title(f'Slew Rate: {str(slew*settings.units.time)} | Fanout: {str(load*settings.units.capacitance)}')
+                axes[-1].set_xlabel(f'Time [{time_units}]')
 
-                # Set up plots
-                for ax in axes:
+                # Plot each signal on its own axis
+                analysis = harness.results[i][j]
+                t = analysis.time / settings.units.time
+                for (ax, (label, node)) in zip(axes, signals):
                     for level in [settings.logic_threshold_low, settings.logic_threshold_high]:
                         ax.axhline(level*settings.vdd.voltage, color='0.5', linestyle='--')
                     # TODO: Set up vlines for important timing events
                     ax.set_yticks([settings.vss.voltage, settings.vdd.voltage])
-                volt_units = str(settings.units.voltage.prefixed_unit)
-                time_units = str(settings.units.time.prefixed_unit)
-                axes[CLK].set(
-                    title=f'Slew Rate: {str(slew*settings.units.time)} | Fanout: {str(load*settings.units.capacitance)}',
-                    ylabel=f'CLK [{volt_units}]'
-                )
-                if self.set:
-                    axes[S].set_ylabel(f'S [{volt_units}]')
-                if self.reset:
-                    axes[R].set_ylabel(f'R [{volt_units}]')
-                axes[D].set_ylabel(f'D [{volt_units}]')
-                axes[Q].set_ylabel(f'Q [{volt_units}]')
-                axes[-1].set_xlabel(f'Time [{str(settings.units.time.prefixed_unit)}]')
-                analysis = harness.results[str(slew)][str(load)]
-                t = analysis.time / settings.units.time
-                axes[CLK].plot(t, analysis.vcin)
-                if self.set:
-                    axes[S].plot(t, analysis.vsin)
-                if self.reset:
-                    axes[R].plot(t, analysis.vrin)
-                axes[D].plot(t, analysis.vin)
-                axes[Q].plot(t, analysis.vout)
+                    ax.set_ylabel(f'{label} [{volt_units}]')
+                    ax.plot(t, analysis[node])
 
                 figures.append(figure)
         return figures
 
+def _scan_netlist(path, pattern) -> list:
+    """Return all lines of the netlist at path matching the compiled bytes pattern.
+
+    The file is memory-mapped so the regex engine scans it directly."""
+    with open(path, 'rb') as file:
+        if Path(path).stat().st_size == 0:
+            return [] # Empty files can't be mapped
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as netlist:
+            return [line.decode() for line in pattern.findall(netlist)]
+
+def _precompute_scales(settings) -> dict:
+    """Return factors converting SI values to library units for time, voltage, and capacitance.
+
+    Divide a value in library units by the matching factor to get it in SI units."""
+    return {
+        'time': (1 @ u_s).convert(settings.units.time.prefixed_unit).value,
+        'voltage': (1 @ u_V).convert(settings.units.voltage.prefixed_unit).value,
+        'capacitance': (1 @ u_F).convert(settings.units.capacitance.prefixed_unit).value,
+    }
+
+def _get_simulator(name: str):
+    """Return a simulator for the named backend, creating it on first use"""
+    if name not in _SIMULATORS:
+        _SIMULATORS[name] = Simulator.factory(simulator=name)
+    return _SIMULATORS[name]
+
+def _get_function(expr: str) -> Function:
+    """Return the Function for expr, reusing the same object for repeated expressions"""
+    expr = expr.strip()
+    function = _FUNCTION_CACHE.get(expr)
+    if function is None:
+        if not parse_logic(expr):
+            raise ValueError(f'Invalid function "{expr}"')
+        # Check if we already recognize this function
+        function = Function(expr)
+        for reg_name, reg_func in registered_functions.items():
+            if reg_func == function:
+                # Copy test vectors
+                function.stored_test_vectors = reg_func.test_vectors
+        _FUNCTION_CACHE[expr] = function
+    return function
+
+def _init_trial_worker(test_manager, settings):
+    """Store the test manager and settings used by this worker process's trials"""
+    global _worker_test_manager, _worker_settings
+    _worker_test_manager = test_manager
+    _worker_settings = settings
+
+def _run_delay_worker(harness, context, slew, load, trial_name) -> dict:
+    """Run a single delay trial and return its measurements. Helper for multiprocessing
+
+    Only the measured values are returned, as the analysis itself can't be pickled."""
+    result = _worker_test_manager._run_delay(_worker_settings, harness, context, slew, load, trial_name)
+    return {'prop_in_out': result['prop_in_out'], 'trans_out': result['trans_out']}
+
+def _run_sequential_delay_worker(harness, slew, load, trial_name) -> dict:
+    """Run a single sequential delay trial and return its measurements. Helper for multiprocessing"""
+    result = _worker_test_manager._run_delay(_worker_settings, harness, slew, load, trial_name)
+    return {key: result[key] for key in ['prop_in_out', 'trans_out', 't_setup', 't_hold']}
+
 def _flip_direction(direction: str) -> str:
     return 'fall' if direction == 'rise' else 'rise'
 
 def _gen_graycode(length: int):
     """Generate the list of Gray Codes of specified length"""
-    if length <= 1:
-        return [[0],[1]]
-    inputs = []
-    for j in _gen_graycode(length-1):
-        j.insert(0, 0)
-        inputs.append(j)
-    for j in reversed(_gen_graycode(length-1)):
-        j.insert(0, 1)
-        inputs.append(j)
-    return inputs
+    length = max(length, 1)
+    shifts = range(length-1, -1, -1)
+    codes = (i ^ (i >> 1) for i in range(1 << length))
+    return [[(code >> shift) & 1 for shift in shifts] for code in codes]
+
+def _parse_time_range(value, name: str) -> tuple:
+    """Parses a search range for setup or hold time into a (min, max) tuple of floats"""
+    if not isinstance(value, (list, tuple)) or not all(isinstance(t, (int, float)) for t in value):
+        raise TypeError(f'Invalid type for {name} time range: {value}. Expected a list of numbers')
+    if not value or min(value) < 0:
+        raise ValueError(f'Invalid value for {name} time range: {value}. Times must be non-negative')
+    return (float(min(value)), float(max(value)))
 
 def _parse_triggered_pin(value: str, role: str) -> (str, Pin):
     """Parses input pin names with trigger types, e.g. 'posedge CLK'"""
     if not isinstance(value, str):
         raise TypeError(f'Invalid type for edge-triggered pin: {type(value)}')
-    try:
-        edge, name = value.split()
-    except ValueError:
+    fields = value.split()
+    if len(fields) != 2:
         raise ValueError(f'Invalid value for edge-triggered pin: {value}. Make sure you include both the trigger type and pin name (e.g. "posedge CLK")')
-    if not edge in ['posedge', 'negedge']:
+    (edge, name) = fields
+    if edge not in _EDGES:
         raise ValueError(f'Invalid trigger type: {edge}. Trigger type must be one of "posedge" or "negedge"')
     return (edge, Pin(name, 'input', role))
@@ -35,9 +35,20 @@ class Function:
     """Provides function evaluation and mapping faculties"""
     def __init__(self, expression: str, test_vectors: list=[]) -> None:
         """Initialize a new Function"""
-        self.expression = expression.replace('!','~')
+        self.expression = expression
         self.stored_test_vectors = test_vectors
 
+    @property
+    def expression(self) -> str:
+        """Return the function's expression"""
+        return self._expression
+
+    @expression.setter
+    def expression(self, value: str):
+        """Set the function's expression and discard any previously generated test vectors"""
+        self._expression = value.replace('!','~')
+        self._generated_test_vectors = None
+
     @property
     def operands(self) -> list:
         """Return a list of operand names"""
@@ -95,6 +106,8 @@ class Function:
         """Generate test vectors, or return stored configuration."""
         if self.stored_test_vectors: # If assigned and not empty, use stored
             return self.stored_test_vectors
+        if self._generated_test_vectors is not None: # If already generated, reuse them
+            return self._generated_test_vectors
         # The basic idea here is to use the truth tables we already have to generate test vectors.
         # Look at each row one at a time, and compare it to all lower rows in the truth table which
         # have a different output.
@@ -122,6 +135,7 @@ class Function:
                     test_vectors.append(delta_row)
                     # Append a second copy with each element reversed
                     test_vectors.append([s[::-1] for s in delta_row])
+        self._generated_test_vectors = test_vectors
         return test_vectors
 
 
@@ -1,10 +1,9 @@
 #! /usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import argparse, os, re, yaml
+import argparse, logging, os, re, yaml
 from pathlib import Path
 
-import matplotlib.pyplot as plt
 import numpy as np
 from liberty.parser import parse_liberty
 from PySpice.Logging import Logging
@@ -37,6 +36,8 @@ def main():
             help='Place the characterization results in the specified file')
     parser_characterize.add_argument('--multithreaded', action='store_true',
             help='Enable multithreaded execution')
+    parser_characterize.add_argument('-j', '--jobs', type=int, default=None,
+            help='The maximum number of worker processes to use during multithreaded execution')
     parser_characterize.add_argument('--comparewith', type=str, default='',
             help='A liberty file to compare results with')
     parser_characterize.add_argument('-f', '--filters', nargs='*',
@@ -107,6 +108,15 @@ def run_charlib(args):
     characterizer.settings.quiet = characterizer.settings.quiet or args.quiet
     characterizer.settings.use_multithreaded = characterizer.settings.use_multithreaded or args.multithreaded
 
+    # Display simulation progress messages unless quiet
+    logging.basicConfig(format='%(message)s')
+    if characterizer.settings.debug:
+        logging.getLogger('charlib').setLevel(logging.DEBUG)
+    elif not characterizer.settings.quiet:
+        logging.getLogger('charlib').setLevel(logging.INFO)
+    if args.jobs:
+        characterizer.settings.jobs = max(args.jobs, 1)
+
     # Filter list of cells based on cell_filters
     if args.filters:
         filtered_cells = {}
@@ -176,6 +186,7 @@ def run_charlib(args):
 
 def compare(benchmark, characterized):
     """Compare prop delay and trans delay for each cell and make scatter plots"""
+    import matplotlib.pyplot as plt
     charlib_rise_prop_data = []
     benchmark_rise_prop_data = []
     charlib_fall_prop_data = []
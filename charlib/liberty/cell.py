@@ -1,9 +1,16 @@
 """This module contains data structures used to read and write liberty files"""
 
+import re
 from dataclasses import dataclass
 
 import numpy as np
-import matplotlib.pyplot as plt
+
+# Matches the start of every non-empty line
+_INDENT_RE = re.compile(r'^(?!$)', re.MULTILINE)
+
+def indent(text: str, prefix: str = '  ') -> str:
+    """Indent every non-empty line of text with prefix. Used to nest liberty groups"""
+    return _INDENT_RE.sub(prefix, text)
 
 class Cell:
     """A single standard cell"""
@@ -79,11 +86,9 @@ class Cell:
         for key, value in self.attributes:
             lib_str.append(f'  {key} : {value};')
         for flop in self.flops:
-            for line in str(flop).split('\n'):
-                lib_str.append(f'  {line}')
+            lib_str.append(indent(str(flop)))
         for pin in dict(sorted(self.pins.items())).values():
-            for line in str(pin).split('\n'):
-                lib_str.append(f'  {line}')
+            lib_str.append(indent(str(pin)))
         lib_str.append('}')
         return '\n'.join(lib_str)
 
@@ -214,8 +219,7 @@ class Pin:
             lib_str.append(f'  three_state : "{self.three_state}";')
         # Internal power
         for data in self.internal_power:
-            for line in str(data).split('\n'):
-                lib_str.append(f'  {line}')
+            lib_str.append(indent(str(data)))
         # min_pulse_width
         if self.role in ['clock', 'set', 'reset']:
             if self.min_pulse_width_high:
@@ -224,8 +228,7 @@ class Pin:
                 lib_str.append(f'  min_pulse_width_low : {self.min_pulse_width_low};')
         # Timing
         for data in self.timings:
-            for line in str(data).split('\n'):
-                lib_str.append(f'  {line}')
+            lib_str.append(indent(str(data)))
         lib_str.append('}')
         return '\n'.join(lib_str)
 
@@ -239,6 +242,7 @@ class Pin:
         Generate two plots: one for rise timing and one for fall timing. Both plots
         should display propagation and transient delay as a function of slew rate and
         capacitive load."""
+        import matplotlib.pyplot as plt
         # Input pins may not have delay data to plot. Prevent plotting in these cases
         if self.direction == 'output':
             figs = []
@@ -329,10 +333,8 @@ class InternalPowerData:
         internal_power_str = ['internal_power () {']
         if self.related_pin:
             internal_power_str.append(f'  related_pin : "{self.related_pin}";')
-        for line in str(self.rise_power).split('\n'):
-            internal_power_str.append(f'  {line}')
-        for line in str(self.fall_power).split('\n'):
-            internal_power_str.append(f'  {line}')
+        internal_power_str.append(indent(str(self.rise_power)))
+        internal_power_str.append(indent(str(self.fall_power)))
         internal_power_str.append('}')
         return '\n'.join(internal_power_str)
 
@@ -394,8 +396,7 @@ class TimingData:
         for key, value in self.attributes:
             timing_str.append(f'  {key} : {value};')
         for table in self._tables.values():
-            for line in str(table).split('\n'):
-                timing_str.append(f'  {line}')
+            timing_str.append(indent(str(table)))
         timing_str.append('}')
         return '\n'.join(timing_str)
 
@@ -1,5 +1,6 @@
 """Models liberty library groups"""
 
+from charlib.liberty.cell import indent
 from charlib.liberty.UnitsSettings import UnitsSettings
 
 # TODO: wire loads, operating conditions, power supplies
@@ -136,14 +137,12 @@ class Library:
         # Display templates from cells
         lib_str.append('\n  /* Table Templates */')
         for template in self.templates():
-            for line in template.split('\n'):
-                lib_str.append(f'  {line}')
+            lib_str.append(indent(template))
 
         # Display cells
         for name, cell in self.cells.items():
             lib_str.append(f'\n  /* {name} */')
-            for line in str(cell).split('\n'):
-                lib_str.append(f'  {line}')
+            lib_str.append(indent(str(cell)))
         
         lib_str.append('}')
         return '\n'.join(lib_str)